@@ -1,4 +1,4 @@
-"""Data classes Stop, Eta, Interchange and RouteInfo,
+"""Data classes Stop, StopLocation, Eta, Interchange and RouteInfo,
 as well as MyEncoder to serialize these data classes to JSON."""
 from __future__ import annotations
 
@@ -32,6 +32,34 @@ class Stop:
             f"stop_id={self.stop_id})")
 
 
+class StopLocation:
+    """Stores one stop of a company together with its name and coordinates"""
+    stop_id: str
+    company: str
+    name_en: str
+    name_tc: str
+    name_sc: str
+    lat: float
+    long: float
+
+    def __init__(self, *, stop_id: str, company: str, name_en: str, name_tc: str, name_sc: str, lat: float, long: float) -> None:
+        self.stop_id = stop_id
+        self.company = company
+        self.name_en = name_en
+        self.name_tc = name_tc
+        self.name_sc = name_sc
+        self.lat = lat
+        self.long = long
+
+    def __repr__(self) -> str:
+        return (
+            f"StopLocation(stop_id='{self.stop_id}', "
+            f"company='{self.company}', "
+            f"name_en='{self.name_en}', "
+            f"lat={self.lat}, "
+            f"long={self.long})")
+
+
 @total_ordering
 class Eta:
     """Stores one ETA of a route"""
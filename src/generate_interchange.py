@@ -0,0 +1,94 @@
+# pylint: disable=unspecified-encoding
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from datetime import datetime
+
+from data_classes import SerializedInterchangeList
+from stop_data import StopListLoader
+from stop_index import StopGridIndex, generate_interchange
+
+
+STOPS_CACHE_PATH = "../interchanges/STOPS_CACHE.json"
+
+
+def positive_float(value: str) -> float:
+    """argparse type for distances in metres"""
+    try:
+        number = float(value)
+    except ValueError:
+        number = 0
+    if not (math.isfinite(number) and number > 0):
+        raise argparse.ArgumentTypeError(f"must be a positive number of metres, got {value}")
+    return number
+
+
+def format_interchange(interchange: SerializedInterchangeList) -> str:
+    """JSON in the layout of the existing interchange files, with one [stop position, stop ID] pair per line"""
+    return re.sub(
+        r'\[\s+("(?:[^"\\]|\\.)*"),\s+("(?:[^"\\]|\\.)*")\s+\]',
+        r"[\1, \2]",
+        json.dumps(interchange, ensure_ascii=False, indent=4),
+    )
+
+
+parser = argparse.ArgumentParser(
+    description="Generate an interchange file from all KMB and CTB stops within a radius of a point.")
+parser.add_argument("lat", type=float, help="Latitude of the centre point, e.g. 22.3036")
+parser.add_argument("long", type=float, help="Longitude of the centre point, e.g. 114.1818")
+parser.add_argument("--radius", type=positive_float, default=150, help="Search radius in metres (default: 150)")
+parser.add_argument("--id", default="MY_INTERCHANGE", help="Interchange ID (default: MY_INTERCHANGE)")
+parser.add_argument("--name-en", help="English name (default: name of the nearest stop)")
+parser.add_argument("--name-tc", help="Traditional Chinese name (default: name of the nearest stop)")
+parser.add_argument("--name-sc", help="Simplified Chinese name (default: name of the nearest stop)")
+parser.add_argument("--cluster-gap", type=positive_float, default=30,
+                    help="Stops closer than this many metres get the same stop position letter (default: 30)")
+parser.add_argument("--pair-distance", type=positive_float, default=20,
+                    help="A CTB stop shares the stop position of the nearest KMB stop within this many metres, "
+                         "even if that KMB stop has a different letter (default: 20)")
+parser.add_argument("--output", help="Write to this file in ../interchanges/ instead of printing, e.g. myroutes.json")
+args = parser.parse_args()
+
+output_path = f"../interchanges/{args.output}" if args.output else None
+if output_path and os.path.exists(output_path):
+    parser.error(f"{output_path} already exists. Choose another filename or delete the file first.")
+
+
+print("Loading stops. The first run downloads all stops and may take a few minutes.", datetime.now())
+try:
+    stops = StopListLoader(STOPS_CACHE_PATH).stops
+except RuntimeError as e:
+    sys.exit(f"Failed to load stops: {e}")
+index = StopGridIndex(stops)
+print(f"Loaded {len(stops)} stops.", datetime.now())
+
+started = datetime.now()
+nearby_stops = index.query_radius(args.lat, args.long, args.radius)
+elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+if not nearby_stops:
+    sys.exit(f"No stops found within {args.radius:g} m of ({args.lat}, {args.long}). Try a larger --radius.")
+
+interchange = generate_interchange(
+    nearby_stops,
+    interchange_id=args.id,
+    cluster_gap=args.cluster_gap,
+    pair_distance=args.pair_distance,
+    name_en=args.name_en,
+    name_tc=args.name_tc,
+    name_sc=args.name_sc,
+)
+print(f"Found {len(nearby_stops)} stops within {args.radius:g} m in {elapsed_ms:.1f} ms.\n")
+
+if output_path:
+    try:
+        with open(output_path, "x") as f:
+            f.write(format_interchange(interchange))
+    except FileExistsError:
+        parser.error(f"{output_path} already exists. Choose another filename or delete the file first.")
+    print(f"Written to {output_path}")
+else:
+    print(format_interchange(interchange))
@@ -1,5 +1,6 @@
 # pylint: disable=unspecified-encoding
 
+import argparse
 import os
 import re
 import tkinter as tk
@@ -11,6 +12,8 @@ import tabulate
 from config import LANGUAGE, STRINGS
 from data_classes import Eta, RouteInfo, Interchange
 from route_data import InterchangeLoader, RouteLoader
+import profiling
+from profiling import profiled
 
 
 def ask_interchange_path() -> str:
@@ -191,6 +194,7 @@ class App(tk.Tk):
             self.treeviews[interchange.interchange_code] = treeview
 
 
+    @profiled("sort_and_add_routes")
     def sort_and_add_routes(self, interchange_code: str, column: str, treeview: ttk.Treeview):
         # Delete all items
         treeview.delete(*treeview.get_children())
@@ -216,5 +220,15 @@ class App(tk.Tk):
             )
 
 
+parser = argparse.ArgumentParser(description="Display bus arrival times at bus interchanges in Hong Kong.")
+parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="Write cProfile and tracemalloc reports of loading and ETA updates to ../profiles/",
+)
+args = parser.parse_args()
+if args.profile:
+    profiling.enable()
+
 INTERCHANGE_PATH = ask_interchange_path()
 App()
@@ -0,0 +1,246 @@
+"""Opt-in profiling hooks for the load and refresh hot paths.
+
+Profiling is disabled by default, in which case `profiled` adds nothing but a flag check.
+Running `main.py --profile` calls `enable()`, after which every decorated phase writes
+a cProfile dump and a short summary of its top functions and allocation sites
+to a timestamped directory in ../profiles/."""
+# pylint: disable=unspecified-encoding
+
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tracemalloc
+from datetime import datetime
+from functools import wraps
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, TypeVar
+
+
+PROFILES_PATH = "../profiles"
+TRACEMALLOC_FRAMES = 10
+TOP_N = 15
+SNAPSHOT_INTERVAL_SECS = 60
+
+# From Python 3.12, cProfile uses sys.monitoring, which is shared by all threads of the interpreter:
+# the phase's profiler already sees the worker threads, and a second profiler cannot be enabled at the same time
+PROFILER_COVERS_ALL_THREADS = sys.version_info >= (3, 12)
+
+F = TypeVar("F", bound=Callable)
+
+_output_dir: Optional[str] = None
+_call_counts: Dict[str, int] = {}
+_lock = Lock()
+_stop_snapshots = Event()
+
+
+class _Phase:
+    """A running call of a decorated function"""
+    profiler: cProfile.Profile
+    thread_profilers: List[cProfile.Profile]
+    excluded_secs: float # Profiling overhead of nested phases, not counted towards this phase's wall time
+
+    def __init__(self) -> None:
+        self.profiler = cProfile.Profile()
+        self.thread_profilers = []
+        self.excluded_secs = 0
+
+
+_phase_stack: List[_Phase] = []
+
+
+def is_enabled() -> bool:
+    return _output_dir is not None
+
+
+def enable(snapshot_interval_secs: float = SNAPSHOT_INTERVAL_SECS) -> str:
+    """Create the output directory, start tracemalloc and the periodic memory snapshots.
+    Returns the output directory."""
+    global _output_dir # pylint: disable=global-statement
+
+    _output_dir = os.path.join(PROFILES_PATH, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(_output_dir, exist_ok=True)
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    _stop_snapshots.clear()
+    atexit.register(disable)
+
+    if snapshot_interval_secs > 0:
+        Thread(target=_take_periodic_snapshots, args=(snapshot_interval_secs,), daemon=True).start()
+
+    print("Profiling enabled. Output will be written to", os.path.abspath(_output_dir))
+    return _output_dir
+
+
+def disable() -> None:
+    """Stop the periodic memory snapshots and tracemalloc. Called automatically at exit."""
+    global _output_dir # pylint: disable=global-statement
+
+    if not is_enabled():
+        return
+
+    _stop_snapshots.set()
+    tracemalloc.stop()
+    _output_dir = None
+    atexit.unregister(disable)
+
+
+def profiled(phase: str) -> Callable[[F], F]:
+    """Decorator that profiles every call of the decorated function as `phase` while profiling is enabled.
+
+    Nested phases (e.g. _merge_routes inside _fetch_all_routes) pause the outer profiler while they run,
+    so each phase's cProfile output only contains its own calls. Allocation sites are only recorded
+    for the outermost phase, as tracemalloc snapshots are too slow to take on every nested call."""
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+
+            entered = perf_counter()
+            parent = _phase_stack[-1] if _phase_stack else None
+            if parent:
+                parent.profiler.disable()
+
+            with _lock:
+                call_number = _call_counts.get(phase, 0) + 1
+                _call_counts[phase] = call_number
+
+            before = tracemalloc.take_snapshot() if not parent else None
+            current = _Phase()
+            _phase_stack.append(current)
+            started = perf_counter()
+
+            # Another profiling tool (e.g. a debugger or coverage) may already be active,
+            # in which case the function still runs, just unprofiled
+            try:
+                current.profiler.enable()
+                is_profiling = True
+            except ValueError as e:
+                print(f"Profiling: could not profile {phase}:", repr(e))
+                is_profiling = False
+            try:
+                return func(*args, **kwargs)
+            finally:
+                current.profiler.disable()
+                elapsed_secs = perf_counter() - started
+                _phase_stack.pop()
+
+                # Never let a failed report mask the function's own exception or break the app
+                if is_profiling:
+                    try:
+                        _write_phase_report(f"{phase}_{call_number:03d}", current, before, elapsed_secs - current.excluded_secs)
+                    except Exception as e: # pylint: disable=broad-exception-caught
+                        print(f"Profiling: failed to write report for {phase}:", repr(e))
+
+                if parent:
+                    parent.excluded_secs += (perf_counter() - entered) - elapsed_secs + current.excluded_secs
+                    try:
+                        parent.profiler.enable()
+                    except ValueError:
+                        pass
+
+        return wrapper # type: ignore
+
+    return decorator
+
+
+def profile_thread(target: Callable[[], None]) -> Callable[[], None]:
+    """Wrap a Thread target started within a phase, so that its calls are also profiled.
+
+    Before Python 3.12, cProfile only profiles the thread it is enabled in, so each worker thread gets its own profiler.
+    These are reported separately from the phase's own thread, which mostly waits for them to finish.
+    From Python 3.12, the phase's profiler covers all threads and the target is returned unchanged."""
+    if PROFILER_COVERS_ALL_THREADS or not is_enabled() or not _phase_stack:
+        return target
+
+    phase = _phase_stack[-1]
+
+    def wrapper() -> None:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active; profiling must never stop the target from running
+            target()
+            return
+
+        with _lock:
+            phase.thread_profilers.append(profiler)
+        try:
+            target()
+        finally:
+            profiler.disable()
+
+    return wrapper
+
+
+def _filtered_allocations(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot) -> List[tracemalloc.StatisticDiff]:
+    """Top allocation sites changed between the snapshots, excluding those of the profiling tools themselves"""
+    excluded_files = {tracemalloc.__file__, cProfile.__file__, pstats.__file__, __file__}
+    return [
+        stat for stat in after.compare_to(before, "lineno")
+        if stat.traceback[0].filename not in excluded_files
+    ][:TOP_N]
+
+
+def _format_stats(stats: pstats.Stats, stream: io.StringIO) -> str:
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_N)
+    return stream.getvalue()
+
+
+def _write_phase_report(name: str, phase: _Phase, before: Optional[tracemalloc.Snapshot], elapsed_secs: float) -> None:
+    assert _output_dir is not None
+    phase.profiler.dump_stats(os.path.join(_output_dir, f"{name}.prof"))
+
+    # Top functions by cumulative time
+    stats_stream = io.StringIO()
+    summary = _format_stats(pstats.Stats(phase.profiler, stream=stats_stream), stats_stream)
+
+    with open(os.path.join(_output_dir, f"{name}.txt"), "wt") as f:
+        f.write(f"Phase: {name}\n")
+        f.write(f"Wall time: {elapsed_secs:.3f} s\n\n")
+        f.write(f"Top {TOP_N} functions by cumulative time:\n")
+        f.write(summary)
+
+        # Worker threads started within this phase, e.g. the API requests in _fetch_all_routes
+        thread_profilers = [profiler for profiler in phase.thread_profilers if profiler.getstats()]
+        if thread_profilers:
+            thread_stats_stream = io.StringIO()
+            thread_stats = pstats.Stats(*thread_profilers, stream=thread_stats_stream)
+            thread_stats.dump_stats(os.path.join(_output_dir, f"{name}_threads.prof"))
+            f.write(f"\nTop {TOP_N} functions by cumulative time in {len(thread_profilers)} worker threads (summed):\n")
+            f.write(_format_stats(thread_stats, thread_stats_stream))
+
+        if before:
+            f.write(f"\nTop {TOP_N} allocation sites (change during phase):\n")
+            f.writelines(f"{stat}\n" for stat in _filtered_allocations(tracemalloc.take_snapshot(), before))
+        else:
+            f.write("\nAllocation sites of nested phases are included in the outermost phase's report.\n")
+
+
+def _take_periodic_snapshots(interval_secs: float) -> None:
+    """Write the top allocation sites every `interval_secs`, compared against the first snapshot,
+    so that slow growth (e.g. from repeated ETA updates) shows up over a long session."""
+    baseline = tracemalloc.take_snapshot()
+    snapshot_number = 0
+
+    while not _stop_snapshots.wait(interval_secs):
+        output_dir = _output_dir
+        if not output_dir:
+            return
+        snapshot_number += 1
+
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+
+            with open(os.path.join(output_dir, f"memory_{snapshot_number:03d}.txt"), "wt") as f:
+                f.write(f"Memory snapshot {snapshot_number} at {datetime.now()}\n")
+                f.write(f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+                f.write(f"Top {TOP_N} allocation sites (change since profiling started):\n")
+                f.writelines(f"{stat}\n" for stat in _filtered_allocations(snapshot, baseline))
+        except Exception as e: # pylint: disable=broad-exception-caught
+            print("Profiling: failed to write memory snapshot:", repr(e))
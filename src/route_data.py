@@ -9,6 +9,7 @@ import requests
 
 from data_classes import MyEncoder, Stop, Eta, Interchange, RouteInfo, InterchangeRoutes, SerializedInterchangeList
 from config import LANGUAGE, CTB_LANGUAGE, KMB_ENDPOINT, CTB_ENDPOINT, CTB_BATCH_ROUTE_ENDPOINT, CTB_BATCH_ETA_ENDPOINT, REQUEST_TIMEOUT_SECS
+from profiling import profiled, profile_thread
 
 
 class InterchangeLoader:
@@ -19,6 +20,7 @@ class InterchangeLoader:
     def __init__(self, filename: str) -> None:
         self.data = self._load_json_routes(filename)
 
+    @profiled("_load_json_routes")
     def _load_json_routes(self, filename: str) -> List[Interchange]:
         # Get data from JSON directly
         with open(filename) as f:
@@ -60,6 +62,7 @@ class RouteLoader:
         self.interchanges = interchanges
         self.routes = self._fetch_all_routes()
 
+    @profiled("_fetch_all_routes")
     def _fetch_all_routes(self) -> InterchangeRoutes:
         """Get all routes passing through all the interchanges"""
         # Try to import from JSON file, fallbacks to regular API calling if needed
@@ -103,7 +106,7 @@ class RouteLoader:
 
 
                     t = Thread(
-                        target = lambda: raw_routes[interchange.interchange_code].append(
+                        target = profile_thread(lambda: raw_routes[interchange.interchange_code].append(
                                 self._fetch_kmb_route_info(
                                     stop_sequence = route["seq"],
                                     stop_position = stop.stop_position,
@@ -111,7 +114,7 @@ class RouteLoader:
                                     bound = route["bound"],
                                     service_type = route["service_type"]
                                 )
-                            ),
+                            )),
                         daemon = True)
                     t.start()
                     threads.append(t)
@@ -123,14 +126,14 @@ class RouteLoader:
                 routes = requests.get(f"{CTB_BATCH_ROUTE_ENDPOINT}/stop-route/CTB/{stop.stop_id}", timeout=REQUEST_TIMEOUT_SECS).json()['data']
                 for route in routes:
                     # For every route, start a thread to append a RouteInfo object
-                    t = Thread(target = lambda: raw_routes[interchange.interchange_code].append(
+                    t = Thread(target = profile_thread(lambda: raw_routes[interchange.interchange_code].append(
                             self._fetch_ctb_route_info(
                                 stop_sequence = route["seq"],
                                 stop_position = stop.stop_position,
                                 route = route["route"],
                                 bound = route["dir"],
                             )
-                        ),
+                        )),
                         daemon = True)
                     t.start()
                     threads.append(t)
@@ -210,6 +213,7 @@ class RouteLoader:
         return info
 
 
+    @profiled("_merge_routes")
     def _merge_routes(self, input_routes: List[RouteInfo]):
         output_routes = []
         added_routes = []
@@ -254,6 +258,7 @@ class RouteLoader:
         return output_routes
 
 
+    @profiled("update_all_eta")
     def update_all_eta(self, interchange: Interchange) -> None:
         interchange_routes = self.routes[interchange.interchange_code]
 
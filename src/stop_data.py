@@ -0,0 +1,120 @@
+# pylint: disable=unspecified-encoding
+
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import sleep
+from typing import Any, Dict, List
+
+import requests
+
+from data_classes import MyEncoder, StopLocation
+from config import KMB_ENDPOINT, CTB_ENDPOINT, REQUEST_TIMEOUT_SECS
+
+
+MAX_CONCURRENT_REQUESTS = 16
+REQUEST_ATTEMPTS = 3
+
+
+class StopListLoader:
+    """A class to load all KMB and CTB stops with their coordinates"""
+    filename: str
+    stops: List[StopLocation]
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.stops = self._fetch_all_stops()
+
+    def _fetch_all_stops(self) -> List[StopLocation]:
+        """Get all stops of all companies"""
+        # Try to import from JSON file, fallbacks to regular API calling if needed
+        try:
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+            return [StopLocation(**stop) for stop in data]
+        except FileNotFoundError:
+            pass
+
+        stops = self._fetch_kmb_stops() + self._fetch_ctb_stops()
+
+        # Store output to file
+        with open(self.filename, "x") as f:
+            json.dump(
+                stops,
+                f,
+                ensure_ascii=False,
+                indent=4,
+                cls=MyEncoder
+            )
+
+        return stops
+
+
+    def _fetch_kmb_stops(self) -> List[StopLocation]:
+        # KMB provides every stop in one request
+        raw_stops = self._get_all_data([f"{KMB_ENDPOINT}/stop"])[0]
+
+        return [self._to_stop_location(raw_stop, "KMB") for raw_stop in raw_stops]
+
+
+    def _fetch_ctb_stops(self) -> List[StopLocation]:
+        # CTB has no endpoint listing all stops, so collect the stop IDs of every route in both directions first
+        raw_routes = self._get_all_data([f"{CTB_ENDPOINT}/route/CTB"])[0]
+        route_stops = self._get_all_data([
+            f"{CTB_ENDPOINT}/route-stop/CTB/{raw_route['route']}/{direction}"
+            for raw_route in raw_routes
+            for direction in ["inbound", "outbound"]
+        ])
+        stop_ids = {route_stop["stop"] for stops in route_stops for route_stop in stops}
+
+        # Then get the name and coordinates of every stop
+        raw_stops = self._get_all_data([f"{CTB_ENDPOINT}/stop/{stop_id}" for stop_id in sorted(stop_ids)])
+
+        # Remove empty responses, which arise from stop IDs without stop information
+        return [self._to_stop_location(raw_stop, "CTB") for raw_stop in raw_stops if raw_stop]
+
+
+    def _get_all_data(self, urls: List[str]) -> List[Any]:
+        """Get the data of every URL with a bounded number of concurrent requests.
+        Raises RuntimeError if any request still fails after retrying, so that an incomplete stop list is never cached."""
+        results: List[Any] = []
+        failures: List[str] = []
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            futures = {executor.submit(self._get_data, url): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except (requests.RequestException, ValueError, KeyError) as e:
+                    failures.append(f"{futures[future]}: {e!r}")
+
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} of {len(urls)} requests failed, e.g. {failures[0]}. "
+                "The stop list was not saved; please try again later.")
+
+        return results
+
+
+    @staticmethod
+    def _get_data(url: str) -> Any:
+        """Get the data of one API response, retrying a few times on failure"""
+        for attempt in range(1, REQUEST_ATTEMPTS + 1):
+            try:
+                return requests.get(url, timeout=REQUEST_TIMEOUT_SECS).json()["data"]
+            except (requests.RequestException, ValueError, KeyError):
+                if attempt == REQUEST_ATTEMPTS:
+                    raise
+                sleep(attempt)
+
+
+    @staticmethod
+    def _to_stop_location(raw_stop: Dict[str, Any], company: str) -> StopLocation:
+        return StopLocation(
+            stop_id = raw_stop["stop"],
+            company = company,
+            name_en = raw_stop["name_en"],
+            name_tc = raw_stop["name_tc"],
+            name_sc = raw_stop["name_sc"],
+            lat = float(raw_stop["lat"]),
+            long = float(raw_stop["long"]),
+        )
@@ -0,0 +1,188 @@
+"""A grid spatial index over StopLocation() objects, and helpers to turn the stops
+around a point into an interchange in the format of TEMPLATE.json."""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_classes import StopLocation, SerializedInterchangeList
+
+
+EARTH_RADIUS_METRES = 6371000
+REFERENCE_LAT = 22.3 # Hong Kong; the distortion of the flat projection is negligible within the territory
+DEFAULT_CELL_SIZE_METRES = 100
+
+GridCell = Tuple[int, int]
+
+
+def to_metres(lat: float, long: float) -> Tuple[float, float]:
+    """Project coordinates onto a flat plane in metres (equirectangular projection)"""
+    x = math.radians(long) * math.cos(math.radians(REFERENCE_LAT)) * EARTH_RADIUS_METRES
+    y = math.radians(lat) * EARTH_RADIUS_METRES
+    return (x, y)
+
+
+def distance_metres(a: StopLocation, b: StopLocation) -> float:
+    ax, ay = to_metres(a.lat, a.long)
+    bx, by = to_metres(b.lat, b.long)
+    return math.hypot(ax - bx, ay - by)
+
+
+class StopGridIndex:
+    """Buckets stops into square grid cells, so that a radius query only visits the cells overlapping the circle"""
+    cell_size: float
+    cells: Dict[GridCell, List[Tuple[float, float, StopLocation]]]
+
+    def __init__(self, stops: Iterable[StopLocation], cell_size: float = DEFAULT_CELL_SIZE_METRES) -> None:
+        self.cell_size = cell_size
+        self.cells = {}
+
+        for stop in stops:
+            x, y = to_metres(stop.lat, stop.long)
+            self.cells.setdefault(self._cell_of(x, y), []).append((x, y, stop))
+
+    def _cell_of(self, x: float, y: float) -> GridCell:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def query_radius(self, lat: float, long: float, radius: float) -> List[StopLocation]:
+        """Get all stops within `radius` metres of the point, nearest first"""
+        if not (math.isfinite(radius) and radius > 0):
+            raise ValueError("radius must be a positive finite number")
+
+        centre_x, centre_y = to_metres(lat, long)
+        min_cell_x, min_cell_y = self._cell_of(centre_x - radius, centre_y - radius)
+        max_cell_x, max_cell_y = self._cell_of(centre_x + radius, centre_y + radius)
+
+        # For very large radii, scanning the non-empty cells is cheaper than every cell of the bounding box
+        if (max_cell_x - min_cell_x + 1) * (max_cell_y - min_cell_y + 1) > len(self.cells):
+            cells = self.cells.values()
+        else:
+            cells = [
+                self.cells.get((cell_x, cell_y), [])
+                for cell_x in range(min_cell_x, max_cell_x + 1)
+                for cell_y in range(min_cell_y, max_cell_y + 1)
+            ]
+
+        found: List[Tuple[float, StopLocation]] = []
+        for cell in cells:
+            for x, y, stop in cell:
+                distance = math.hypot(x - centre_x, y - centre_y)
+                if distance <= radius:
+                    found.append((distance, stop))
+
+        return [stop for _, stop in sorted(found, key=lambda x: x[0])]
+
+
+def cluster_stops(stops: List[StopLocation], max_gap: float) -> List[List[StopLocation]]:
+    """Group stops so that every stop is within `max_gap` metres of another stop in the same group.
+    Clusters keep the order of the input, i.e. nearest first if the input comes from query_radius()."""
+    if not (math.isfinite(max_gap) and max_gap > 0):
+        raise ValueError("max_gap must be a positive finite number")
+
+    index = StopGridIndex(stops, cell_size=max_gap)
+    order = {(stop.company, stop.stop_id): i for i, stop in enumerate(stops)}
+    cluster_of: Dict[Tuple[str, str], int] = {}
+    clusters: List[List[StopLocation]] = []
+
+    for stop in stops:
+        if (stop.company, stop.stop_id) in cluster_of:
+            continue
+
+        # Flood fill from this stop through all neighbours within max_gap
+        cluster: List[StopLocation] = []
+        pending = [stop]
+        cluster_of[(stop.company, stop.stop_id)] = len(clusters)
+        while pending:
+            current = pending.pop()
+            cluster.append(current)
+            for neighbour in index.query_radius(current.lat, current.long, max_gap):
+                if (neighbour.company, neighbour.stop_id) not in cluster_of:
+                    cluster_of[(neighbour.company, neighbour.stop_id)] = len(clusters)
+                    pending.append(neighbour)
+
+        clusters.append(sorted(cluster, key=lambda x: order[(x.company, x.stop_id)]))
+
+    return clusters
+
+
+def pair_stops(kmb_stops: List[StopLocation], ctb_stops: List[StopLocation], max_distance: float) -> Dict[str, Optional[StopLocation]]:
+    """Map every CTB stop ID to the nearest KMB stop within `max_distance` metres, or None if there is none"""
+    if not (math.isfinite(max_distance) and max_distance > 0):
+        raise ValueError("max_distance must be a positive finite number")
+
+    index = StopGridIndex(kmb_stops, cell_size=max_distance)
+    pairs: Dict[str, Optional[StopLocation]] = {}
+    for ctb_stop in ctb_stops:
+        nearby_kmb_stops = index.query_radius(ctb_stop.lat, ctb_stop.long, max_distance)
+        pairs[ctb_stop.stop_id] = nearby_kmb_stops[0] if nearby_kmb_stops else None
+
+    return pairs
+
+
+def cluster_label(i: int) -> str:
+    """Letters for the i-th cluster (0-based): A, B, ..., Z, AA, AB, ..., AZ, BA, ..."""
+    label = ""
+    i += 1
+    while i:
+        i, remainder = divmod(i - 1, 26)
+        label = chr(ord("A") + remainder) + label
+    return label
+
+
+def generate_interchange(stops: List[StopLocation],
+                         interchange_id: str,
+                         cluster_gap: float,
+                         pair_distance: float,
+                         name_en: Optional[str] = None,
+                         name_tc: Optional[str] = None,
+                         name_sc: Optional[str] = None,
+                        ) -> SerializedInterchangeList:
+    """Turn stops into an interchange in the format of TEMPLATE.json.
+
+    Every cluster of stops is given a label, and its KMB stops the stop positions A1, A2, ... (B1, B2, ... for the next cluster).
+    A CTB stop shares the stop position of the nearest KMB stop within `pair_distance`, even if it is in another cluster,
+    otherwise it is given the next unused number in its own cluster."""
+    if not stops:
+        raise ValueError("No stops to generate an interchange from")
+
+    clusters = cluster_stops(stops, cluster_gap)
+    all_kmb_stops = [stop for stop in stops if stop.company == "KMB"]
+    all_ctb_stops = [stop for stop in stops if stop.company == "CTB"]
+    pairs = pair_stops(all_kmb_stops, all_ctb_stops, pair_distance)
+
+    # KMB stop positions
+    positions: Dict[str, str] = {}
+    kmb_entries = []
+    for i, cluster in enumerate(clusters):
+        kmb_stops = [stop for stop in cluster if stop.company == "KMB"]
+        for n, stop in enumerate(kmb_stops, start=1):
+            positions[stop.stop_id] = f"{cluster_label(i)}{n}"
+            kmb_entries.append([positions[stop.stop_id], stop.stop_id])
+
+    # CTB stop positions
+    ctb_entries = []
+    for i, cluster in enumerate(clusters):
+        next_number = sum(1 for stop in cluster if stop.company == "KMB") + 1
+        for stop in cluster:
+            if stop.company != "CTB":
+                continue
+            partner = pairs[stop.stop_id]
+            if partner:
+                position = positions[partner.stop_id]
+            else:
+                position = f"{cluster_label(i)}{next_number}"
+                next_number += 1
+            ctb_entries.append([position, stop.stop_id])
+
+    # Default to the name of the nearest stop
+    return {
+        interchange_id: {
+            "name_en": name_en or stops[0].name_en,
+            "name_sc": name_sc or stops[0].name_sc,
+            "name_tc": name_tc or stops[0].name_tc,
+            "stops": {
+                "KMB": kmb_entries,
+                "CTB": ctb_entries,
+            },
+        }
+    }